@@ -1,3 +1,6 @@
+from functools import lru_cache
+from typing import Optional
+
 from pydantic_settings import BaseSettings
 
 
@@ -11,10 +14,57 @@ class Settings(BaseSettings):
     AWS_DEFAULT_REGION: str
     KNOWLEDGE_BASE_ID: str
     GROQ_API_KEY: str
+    PREFETCH_ENABLED: bool = False
+    PREFETCH_TTL_SECONDS: int = 300
+    PREFETCH_MAX_WORKERS: int = 4
+    # A prefetched pool is only served if its best chunk reranks at least this relevant
+    # to the actual question; otherwise the question gets its own retrieval
+    PREFETCH_MIN_RELEVANCE: float = 0.3
+    DOCUMENT_TYPE_NARROWING_ENABLED: bool = False
+    # Built-in document type -> the KB's `document_type` metadata value, e.g. {"lab_report": "LabReport"}.
+    # Inferred filters must match the KB metadata, or every narrowed query falls back to a second retrieve.
+    DOCUMENT_TYPE_LABELS: dict[str, str] = {}
+    MIN_NARROWED_RESULTS: int = 2
+    CHUNK_COMPRESSION_ENABLED: bool = True
+    CHUNK_DUPLICATE_THRESHOLD: float = 0.8
+    PRICE_INPUT_PER_M: float = 3.00
+    PRICE_OUTPUT_PER_M: float = 15.00
+    # Per-model overrides: {"<model_id>": {"input_per_m": 3.0, "output_per_m": 15.0}}
+    MODEL_PRICING: dict[str, dict[str, float]] = {}
+    MAX_OUTPUT_TOKENS: int = 1024
+    BUDGET_WINDOW_SECONDS: int = 3600
+    PATIENT_BUDGET_USD: Optional[float] = None
+    GLOBAL_BUDGET_USD: Optional[float] = None
+    BUDGET_DEGRADE_THRESHOLD: float = 0.8
+    DEGRADED_MAX_TOKENS: int = 512
+    DEGRADED_HISTORY_MESSAGES: int = 4
+    FALLBACK_MODEL_ID: Optional[str] = None
+    # Each worker process claims its own worker-<n> subdirectory, so one value serves --workers N
+    MEMORY_JOURNAL_DIR: Optional[str] = None
+    MEMORY_JOURNAL_FLUSH_INTERVAL_SECONDS: float = 0.5
+    MEMORY_JOURNAL_BATCH_SIZE: int = 1000
+    MEMORY_SNAPSHOT_EVERY: int = 200_000
+    LOG_LEVEL: str = "INFO"
+    LOG_JSON: bool = True
+    LOG_SAMPLE_RATES: dict[str, float] = {"DEBUG": 0.01, "INFO": 0.1}
+    # Characters of patient text kept in logs; 0 logs only a length and a digest
+    LOG_FIELD_MAX_CHARS: int = 0
 
     class Config:
         env_file = ".env"
         case_sensitive = True
 
 
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    return Settings()
+
+
+class _LazySettings:
+    """Resolves Settings on first attribute access instead of at import time."""
+
+    def __getattr__(self, name: str):
+        return getattr(get_settings(), name)
+
+
+settings = _LazySettings()
@@ -1,26 +1,66 @@
-import boto3
+from functools import lru_cache
 
+from app.core.logging_config import logger
+from app.services.budget_service import BudgetService
 from app.services.chat_service import ChatService
+from app.services.chunk_compression_service import ChunkCompressionService
 from app.services.config_service import ConfigService
+from app.services.document_type_service import DocumentTypeService
 from app.services.llm_service import LLMService
+from app.services.memory_journal import MemoryJournal
 from app.services.memory_service import MemoryService
+from app.services.prefetch_service import PrefetchService
+from app.services.token_estimator import TokenEstimator
 
 from .config import settings
 
 # Singleton instance of MemoryService
 _memory_service_instance = None
 
+# Singleton instance of PrefetchService
+_prefetch_service_instance = None
 
+# Singleton instance of DocumentTypeService
+_document_type_service_instance = None
+
+# Singleton instance of ChunkCompressionService
+_chunk_compression_service_instance = None
+
+# Singleton instances of BudgetService and TokenEstimator
+_budget_service_instance = None
+_token_estimator_instance = None
+
+
+# Warm-up calls are best effort and should not hold up readiness for long
+_WARM_UP_TIMEOUT_SECONDS = 5.0
+
+
+# SDK clients are thread-safe and expensive to build (endpoint resolution,
+# credential loading, connection pools), so each one is created once and reused.
+# The SDKs themselves are imported on first use to keep module import cheap.
+@lru_cache(maxsize=1)
 def get_bedrock_agent_runtime_client():
+    import boto3
+
     return boto3.client(
         "bedrock-agent-runtime", region_name=settings.AWS_DEFAULT_REGION
     )
 
 
+@lru_cache(maxsize=1)
 def get_bedrock_runtime_client():
+    import boto3
+
     return boto3.client("bedrock-runtime", region_name=settings.AWS_DEFAULT_REGION)
 
 
+@lru_cache(maxsize=1)
+def get_groq_client():
+    from groq import Groq
+
+    return Groq(api_key=settings.GROQ_API_KEY)
+
+
 def get_config_service():
     return ConfigService()
 
@@ -32,13 +72,90 @@ def get_memory_service():
     """
     global _memory_service_instance
     if _memory_service_instance is None:
-        _memory_service_instance = MemoryService(max_exchanges=6)
+        journal = None
+        if settings.MEMORY_JOURNAL_DIR:
+            journal = MemoryJournal(
+                settings.MEMORY_JOURNAL_DIR,
+                flush_interval=settings.MEMORY_JOURNAL_FLUSH_INTERVAL_SECONDS,
+                batch_size=settings.MEMORY_JOURNAL_BATCH_SIZE,
+                snapshot_every=settings.MEMORY_SNAPSHOT_EVERY,
+            )
+        _memory_service_instance = MemoryService(max_exchanges=6, journal=journal)
     return _memory_service_instance
 
 
+def get_prefetch_service():
+    """
+    Get singleton instance of PrefetchService.
+    The warm retrieval cache must outlive individual requests.
+    """
+    global _prefetch_service_instance
+    if _prefetch_service_instance is None:
+        _prefetch_service_instance = PrefetchService(
+            enabled=settings.PREFETCH_ENABLED,
+            ttl_seconds=settings.PREFETCH_TTL_SECONDS,
+            max_workers=settings.PREFETCH_MAX_WORKERS,
+            labels=settings.DOCUMENT_TYPE_LABELS,
+        )
+    return _prefetch_service_instance
+
+
+def get_document_type_service():
+    """
+    Get singleton instance of DocumentTypeService.
+    Narrowing statistics are aggregated across requests.
+    """
+    global _document_type_service_instance
+    if _document_type_service_instance is None:
+        _document_type_service_instance = DocumentTypeService(
+            labels=settings.DOCUMENT_TYPE_LABELS
+        )
+    return _document_type_service_instance
+
+
+def get_chunk_compression_service():
+    """
+    Get singleton instance of ChunkCompressionService.
+    Compression statistics are aggregated across requests.
+    """
+    global _chunk_compression_service_instance
+    if _chunk_compression_service_instance is None:
+        _chunk_compression_service_instance = ChunkCompressionService(
+            duplicate_threshold=settings.CHUNK_DUPLICATE_THRESHOLD
+        )
+    return _chunk_compression_service_instance
+
+
+def get_budget_service():
+    """
+    Get singleton instance of BudgetService.
+    Rolling spend must be shared by every request to enforce the budgets.
+    """
+    global _budget_service_instance
+    if _budget_service_instance is None:
+        _budget_service_instance = BudgetService(
+            window_seconds=settings.BUDGET_WINDOW_SECONDS,
+            patient_budget_usd=settings.PATIENT_BUDGET_USD,
+            global_budget_usd=settings.GLOBAL_BUDGET_USD,
+            degrade_threshold=settings.BUDGET_DEGRADE_THRESHOLD,
+        )
+    return _budget_service_instance
+
+
+def get_token_estimator():
+    """
+    Get singleton instance of TokenEstimator.
+    Its calibration improves with every call it observes.
+    """
+    global _token_estimator_instance
+    if _token_estimator_instance is None:
+        _token_estimator_instance = TokenEstimator()
+    return _token_estimator_instance
+
+
 def get_llm_service():
     client = get_bedrock_runtime_client()
-    return LLMService(bedrock_runtime=client)
+    return LLMService(bedrock_runtime=client, groq_client=get_groq_client())
 
 
 def get_retrievekb_service():
@@ -46,9 +163,44 @@ def get_retrievekb_service():
     config_service = get_config_service()
     llm_service = get_llm_service()
     memory_service = get_memory_service()
+    prefetch_service = get_prefetch_service()
+    document_type_service = get_document_type_service()
+    chunk_compression_service = get_chunk_compression_service()
+    budget_service = get_budget_service()
+    token_estimator = get_token_estimator()
     return ChatService(
         bedrock_agent_runtime=client,
         config_service=config_service,
         llm_service=llm_service,
         memory_service=memory_service,
+        prefetch_service=prefetch_service,
+        document_type_service=document_type_service,
+        chunk_compression_service=chunk_compression_service,
+        budget_service=budget_service,
+        token_estimator=token_estimator,
+    )
+
+
+def warm_up() -> None:
+    """
+    Pre-resolve SDK clients and open their connections so the first request doesn't pay for it.
+    Connection failures are logged and ignored; requests will simply connect on demand.
+    """
+    # Creating the clients imports the SDKs, resolves endpoints and loads credentials
+    get_bedrock_agent_runtime_client()
+    runtime = get_bedrock_runtime_client()
+    groq_client = get_groq_client()
+
+    # Cheap read-only calls establish pooled TLS connections to each endpoint.
+    # The Groq copy shares the client's connection pool but gives up quickly.
+    quick_groq_client = groq_client.with_options(
+        timeout=_WARM_UP_TIMEOUT_SECONDS, max_retries=0
     )
+    for name, warm in (
+        ("bedrock-runtime", lambda: runtime.list_async_invokes(maxResults=1)),
+        ("groq", lambda: quick_groq_client.models.list()),
+    ):
+        try:
+            warm()
+        except Exception as e:
+            logger.warning("⚠️ Warm-up call to {client} failed: {error}", client=name, error=str(e))
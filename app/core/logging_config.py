@@ -1,3 +1,157 @@
+import hashlib
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import traceback
+
 from loguru import logger
 
 logger = logger.bind(name="Rebecca")
+
+# Probability of keeping a sampled log call, per level. Levels not listed are always kept.
+_sample_rates: dict[str, float] = {}
+# Characters of free text kept by redact(); 0 logs only a length and a digest
+_field_max_chars = 0
+# Per-process key for redact() digests: lines about the same text can be correlated
+# within a process, but a digest can't be reversed by hashing guessed questions offline
+_digest_key = os.urandom(16)
+
+
+class _BackgroundSink:
+    """
+    Loguru sink that only enqueues records; a writer thread formats and writes them.
+
+    loguru's own enqueue=True pickles every record through a multiprocessing pipe,
+    which costs the caller more than writing directly. An in-process queue keeps
+    the caller's share down to building the record.
+    """
+
+    def __init__(self, stream, json_logs: bool):
+        self._stream = stream
+        self._json_logs = json_logs
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, message) -> None:
+        self._queue.put(message.record)
+
+    def stop(self) -> None:
+        """Called by loguru when the handler is removed: drain the queue and stop."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            record = self._queue.get()
+            if record is None:
+                break
+            try:
+                self._stream.write(self._format(record))
+                if self._queue.empty():
+                    self._stream.flush()
+            except Exception as e:
+                sys.__stderr__.write(f"Logging sink error: {e}\n")
+
+    def _format(self, record) -> str:
+        exception = ""
+        if record["exception"] is not None:
+            exc_type, exc_value, exc_traceback = record["exception"]
+            exception = "".join(traceback.format_exception(exc_type, exc_value, exc_traceback))
+
+        if not self._json_logs:
+            line = (
+                f"{record['time']:%Y-%m-%d %H:%M:%S.%f} | {record['level'].name:<8} | "
+                f"{record['name']}:{record['function']}:{record['line']} - {record['message']}\n"
+            )
+            return line + exception
+
+        return json.dumps(
+            {
+                "time": record["time"].isoformat(),
+                "level": record["level"].name,
+                "message": record["message"],
+                "module": record["name"],
+                "function": record["function"],
+                "line": record["line"],
+                # Nested so a message kwarg can never overwrite the fixed keys above
+                "fields": record["extra"],
+                **({"exception": exception} if exception else {}),
+            },
+            ensure_ascii=False,
+            default=str,
+        ) + "\n"
+
+
+def configure_logging(
+    level: str = "INFO",
+    json_logs: bool = True,
+    sample_rates: dict[str, float] | None = None,
+    field_max_chars: int = 0,
+    sink=sys.stderr,
+) -> None:
+    """
+    Configure the application log sink.
+
+    Records are handed to a background thread so serialization and I/O stay off
+    the request path. Tracebacks never include local variable values, which
+    could contain patient data.
+
+    Args:
+        level: Minimum level written to the sink
+        json_logs: Serialize records as JSON lines, with message kwargs under "fields"
+        sample_rates: Keep-probability per level for calls guarded by should_log()
+        field_max_chars: Characters of free text kept by redact(); 0 (the default) keeps none
+        sink: Destination of the log records
+    """
+    global _field_max_chars
+    _sample_rates.clear()
+    _sample_rates.update(sample_rates or {})
+    _field_max_chars = field_max_chars
+
+    logger.remove()
+    logger.add(
+        _BackgroundSink(sink, json_logs),
+        level=level,
+        format="{message}",
+        colorize=False,
+        backtrace=False,
+        diagnose=False,
+    )
+
+
+def shutdown_logging() -> None:
+    """Flush every pending record. Call on application shutdown."""
+    logger.remove()
+
+
+def should_log(level: str) -> bool:
+    """
+    Sampling gate for high-volume log calls.
+
+    Checked before the call so that dropped records cost neither formatting nor
+    argument evaluation.
+    """
+    rate = _sample_rates.get(level)
+    return rate is None or random.random() < rate
+
+
+def redact(text: str | None, limit: int | None = None) -> str:
+    """
+    PHI-safe stand-in for free text: its length and a keyed digest.
+
+    A prefix of the text itself is only included when LOG_FIELD_MAX_CHARS (or
+    limit) opts in, e.g. in development against synthetic records.
+    """
+    if not text:
+        return ""
+    limit = _field_max_chars if limit is None else limit
+    digest = hashlib.blake2b(text.encode(), key=_digest_key, digest_size=6).hexdigest()
+    if limit <= 0:
+        return f"<{len(text)} chars #{digest}>"
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}… <{len(text)} chars #{digest}>"
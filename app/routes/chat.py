@@ -1,16 +1,55 @@
-from typing import Annotated
+import asyncio
+import json
+import threading
+from typing import Annotated, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
-from app.core.logging_config import logger
-from app.core.dependencies import get_retrievekb_service, get_memory_service
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+from starlette.concurrency import iterate_in_threadpool
+from app.core.logging_config import logger, redact
+from app.core.dependencies import (
+    get_budget_service,
+    get_chunk_compression_service,
+    get_document_type_service,
+    get_memory_service,
+    get_prefetch_service,
+    get_retrievekb_service,
+    get_token_estimator,
+)
 from app.schemas import ChatRequest
-from app.schemas.chat_schemas import ChatResponse, LLMResponse
+from app.schemas.chat_schemas import ChatResponse, ChatSocketMessage, LLMResponse
+from app.services.budget_service import BudgetService
 from app.services.chat_service import ChatService
+from app.services.chunk_compression_service import ChunkCompressionService
+from app.services.document_type_service import DocumentTypeService
 from app.services.memory_service import MemoryService
+from app.services.prefetch_service import PrefetchService
+from app.services.token_estimator import TokenEstimator
 
 router = APIRouter()
 
 
+def _error_response() -> LLMResponse:
+    return LLMResponse(
+        model_name="Rebecca (Error Handler)",
+        response=(
+            "I apologize, but I'm experiencing some technical difficulties right now. "
+            "This could be due to a temporary service interruption or connectivity issue.\n\n"
+            "**What you can try:**\n"
+            "- Wait a moment and try your question again\n"
+            "- Rephrase your question if it was very complex\n"
+            "- Check that your internet connection is stable\n\n"
+            "If the problem persists, please contact your system administrator. "
+            "I'm here to help as soon as the issue is resolved!"
+        ),
+        latency=0.0,
+        input_tokens=0,
+        output_tokens=0,
+        total_cost=0.0,
+        kb_fetched=False
+    )
+
+
 @router.post("/chat", response_model=ChatResponse)
 async def chat(
     request: ChatRequest,
@@ -21,30 +60,111 @@ async def chat(
         response = service.generate_response(request.query, request.patient_id, request)
         return response
     except Exception as e:
-        logger.error(f"Chat endpoint error | Patient: {request.patient_id} | Query: '{request.query[:100]}' | Error: {str(e)}")
-        
-        error_response = LLMResponse(
-            model_name="Rebecca (Error Handler)",
-            response=(
-                "I apologize, but I'm experiencing some technical difficulties right now. "
-                "This could be due to a temporary service interruption or connectivity issue.\n\n"
-                "**What you can try:**\n"
-                "- Wait a moment and try your question again\n"
-                "- Rephrase your question if it was very complex\n"
-                "- Check that your internet connection is stable\n\n"
-                "If the problem persists, please contact your system administrator. "
-                "I'm here to help as soon as the issue is resolved!"
-            ),
-            latency=0.0,
-            input_tokens=0,
-            output_tokens=0,
-            total_cost=0.0,
-            kb_fetched=False
+        logger.error(
+            "Chat endpoint error | Patient: {patient_id} | Query: '{query}' | Error: {error}",
+            patient_id=request.patient_id,
+            query=redact(request.query),
+            error=str(e),
         )
         
+        error_response = _error_response()
         return ChatResponse(complete_response=[error_response])
 
 
+@router.websocket("/chat/ws/{patient_id}")
+async def chat_websocket(
+    websocket: WebSocket,
+    patient_id: str,
+    service: Annotated[ChatService, Depends(get_retrievekb_service)],
+):
+    """
+    Interactive chat channel for a single patient session.
+
+    Dependencies are resolved once per connection and reused for every turn.
+    The client sends {"query": ..., "document_type": ...} messages and receives
+    {"type": "token"}, {"type": "done"}, {"type": "cancelled"} or {"type": "error"}
+    events. Sending a new message while an answer is still streaming cancels it.
+    """
+    await websocket.accept()
+    service.start_session(patient_id)
+
+    generation: Optional[asyncio.Task] = None
+    cancel_event = threading.Event()
+    try:
+        while True:
+            frame = await websocket.receive()
+            if frame["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(frame.get("code", 1000), frame.get("reason"))
+            try:
+                payload = json.loads(frame.get("text") or frame.get("bytes") or "")
+                message = ChatSocketMessage.model_validate(payload)
+            except ValidationError as e:
+                await websocket.send_json({"type": "error", "detail": e.errors(include_url=False)})
+                continue
+            except ValueError:
+                await websocket.send_json({"type": "error", "detail": "Messages must be JSON objects"})
+                continue
+
+            # A newer message supersedes the answer currently being generated
+            if generation is not None and not generation.done():
+                cancel_event.set()
+                await generation
+
+            cancel_event = threading.Event()
+            request = ChatRequest(
+                query=message.query,
+                patient_id=patient_id,
+                document_type=message.document_type,
+            )
+            generation = asyncio.create_task(
+                _stream_turn(websocket, service, request, cancel_event)
+            )
+    except WebSocketDisconnect:
+        logger.info("WebSocket closed | Patient: {patient_id}", patient_id=patient_id)
+    finally:
+        cancel_event.set()
+        if generation is not None:
+            await generation
+
+
+async def _stream_turn(
+    websocket: WebSocket,
+    service: ChatService,
+    request: ChatRequest,
+    cancel_event: threading.Event,
+) -> None:
+    """Run one chat turn off the event loop and forward its events to the socket."""
+    events = service.stream_response(request.query, request.patient_id, request, cancel_event)
+    try:
+        async for event in iterate_in_threadpool(events):
+            if event["type"] == "done":
+                event = {"type": "done", "response": event["response"].model_dump()}
+            await websocket.send_json(event)
+    except WebSocketDisconnect:
+        cancel_event.set()
+    except Exception as e:
+        cancel_event.set()
+        logger.error(
+            "WebSocket chat error | Patient: {patient_id} | Query: '{query}' | Error: {error}",
+            patient_id=request.patient_id,
+            query=redact(request.query),
+            error=str(e),
+        )
+        try:
+            await websocket.send_json({"type": "error", "response": _error_response().model_dump()})
+        except Exception:
+            pass
+    finally:
+        cancel_event.set()
+        # Release the Bedrock stream right away instead of waiting for garbage collection.
+        # If this task was cancelled while a worker thread is still inside next(), the
+        # generator can't be closed from here; the cancel event makes it close itself.
+        try:
+            events.close()
+        except ValueError:
+            pass
+
+
 @router.get("/chat/history/{patient_id}")
 async def get_chat_history(
     patient_id: str,
@@ -81,3 +201,33 @@ async def get_memory_stats(
     """Get statistics about stored conversation histories."""
     stats = memory_service.get_stats()
     return stats
+
+
+@router.get("/chat/prefetch/stats")
+async def get_prefetch_stats(
+    prefetch_service: Annotated[PrefetchService, Depends(get_prefetch_service)],
+):
+    """Get prefetch cache statistics and first-KB-turn latency with and without prefetch."""
+    return prefetch_service.get_stats()
+
+
+@router.get("/chat/retrieval/stats")
+async def get_retrieval_stats(
+    document_type_service: Annotated[DocumentTypeService, Depends(get_document_type_service)],
+    chunk_compression_service: Annotated[ChunkCompressionService, Depends(get_chunk_compression_service)],
+):
+    """Get document_type narrowing rate and latency, and how much chunk compression removed."""
+    stats = document_type_service.get_stats()
+    stats["compression"] = chunk_compression_service.get_stats()
+    return stats
+
+
+@router.get("/chat/budget/stats")
+async def get_budget_stats(
+    budget_service: Annotated[BudgetService, Depends(get_budget_service)],
+    token_estimator: Annotated[TokenEstimator, Depends(get_token_estimator)],
+):
+    """Get rolling spend, budget decisions and the token estimator's calibration."""
+    stats = budget_service.get_stats()
+    stats["token_estimator_ratio"] = round(token_estimator.ratio, 4)
+    return stats
@@ -31,3 +31,10 @@ class LLMResponse(BaseModel):
 
 class ChatResponse(BaseModel):
     complete_response: List[LLMResponse]
+
+
+class ChatSocketMessage(BaseModel):
+    """A single user turn sent over the /chat/ws WebSocket channel."""
+
+    query: str
+    document_type: Optional[str] = None
@@ -0,0 +1,194 @@
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+from app.core.config import settings
+
+# Buckets per rolling window; spend is tracked per bucket so memory per key stays bounded
+_BUCKETS_PER_WINDOW = 60
+
+
+def get_model_pricing(model_id: str) -> tuple[float, float]:
+    """
+    Price in USD per million (input, output) tokens for a Bedrock model.
+
+    Args:
+        model_id: Bedrock model ID
+
+    Returns:
+        Tuple of (input_per_m, output_per_m), from MODEL_PRICING or the default prices
+    """
+    pricing = settings.MODEL_PRICING.get(model_id)
+    if pricing:
+        return pricing["input_per_m"], pricing["output_per_m"]
+    return settings.PRICE_INPUT_PER_M, settings.PRICE_OUTPUT_PER_M
+
+
+def compute_cost(model_id: str, input_tokens: int, output_tokens: int) -> float:
+    input_per_m, output_per_m = get_model_pricing(model_id)
+    return (input_tokens / 1_000_000) * input_per_m + (output_tokens / 1_000_000) * output_per_m
+
+
+class _RollingSpend:
+    """Spend over a rolling window, summed into fixed-width time buckets."""
+
+    __slots__ = ("_buckets", "total")
+
+    def __init__(self):
+        self._buckets: deque = deque()  # [bucket_id, cost]
+        self.total = 0.0
+
+    def add(self, bucket_id: int, cost: float) -> None:
+        if self._buckets and self._buckets[-1][0] == bucket_id:
+            self._buckets[-1][1] += cost
+        else:
+            self._buckets.append([bucket_id, cost])
+        self.total += cost
+
+    def expire(self, oldest_bucket_id: int) -> float:
+        while self._buckets and self._buckets[0][0] < oldest_bucket_id:
+            self.total -= self._buckets.popleft()[1]
+        if not self._buckets:
+            self.total = 0.0  # drop float drift once the window is empty
+        return self.total
+
+
+class BudgetService:
+    """
+    In-memory rolling cost budgets per patient and across all patients.
+
+    Before each Claude call, plan() compares current spend plus the worst-case
+    cost of the call with the budgets. Near a limit it degrades the call
+    (fewer output tokens, a cheaper model, shorter history). When even the
+    degraded call does not fit, it rejects the call. All accounting is O(1) per
+    request under a single lock.
+    """
+
+    ALLOW = "allow"
+    DEGRADE = "degrade"
+    REJECT = "reject"
+
+    def __init__(
+        self,
+        window_seconds: int = 3600,
+        patient_budget_usd: Optional[float] = None,
+        global_budget_usd: Optional[float] = None,
+        degrade_threshold: float = 0.8,
+    ):
+        """
+        Initialize the budget service.
+
+        Args:
+            window_seconds: Length of the rolling budget window
+            patient_budget_usd: Maximum spend per patient within the window (None = unlimited)
+            global_budget_usd: Maximum spend across all patients within the window (None = unlimited)
+            degrade_threshold: Fraction of a budget after which calls are degraded
+        """
+        self.window_seconds = window_seconds
+        self.patient_budget_usd = patient_budget_usd
+        self.global_budget_usd = global_budget_usd
+        self.degrade_threshold = degrade_threshold
+        self._bucket_seconds = max(window_seconds / _BUCKETS_PER_WINDOW, 1)
+
+        self._lock = threading.Lock()
+        self._global = _RollingSpend()
+        self._patients: dict[str, _RollingSpend] = {}
+        self._decisions = {self.ALLOW: 0, self.DEGRADE: 0, self.REJECT: 0}
+        self._records_since_sweep = 0
+
+    def plan(self, patient_id: str, full_cost: float, degraded_cost: float) -> str:
+        """
+        Decide how a call may proceed given its worst-case cost.
+
+        Args:
+            patient_id: UUID of the patient
+            full_cost: Worst-case cost of the call as requested
+            degraded_cost: Worst-case cost of the call with degraded settings
+
+        Returns:
+            BudgetService.ALLOW, DEGRADE or REJECT
+        """
+        with self._lock:
+            oldest = self._oldest_bucket_id()
+            global_spent = self._global.expire(oldest)
+            patient = self._patients.get(patient_id)
+            patient_spent = patient.expire(oldest) if patient else 0.0
+
+            decision = self.ALLOW
+            for spent, budget in (
+                (patient_spent, self.patient_budget_usd),
+                (global_spent, self.global_budget_usd),
+            ):
+                if budget is None:
+                    continue
+                if spent + degraded_cost > budget:
+                    decision = self.REJECT
+                    break
+                if spent + full_cost >= budget * self.degrade_threshold:
+                    decision = self.DEGRADE
+
+            self._decisions[decision] += 1
+            return decision
+
+    def record(self, patient_id: str, cost: float) -> None:
+        """
+        Record the actual cost of a completed (or cancelled) call.
+
+        Args:
+            patient_id: UUID of the patient
+            cost: Cost in USD
+        """
+        with self._lock:
+            bucket_id = self._bucket_id()
+            self._global.add(bucket_id, cost)
+            patient = self._patients.get(patient_id)
+            if patient is None:
+                patient = self._patients[patient_id] = _RollingSpend()
+            patient.add(bucket_id, cost)
+
+            # Occasionally drop patients whose spend has left the window
+            self._records_since_sweep += 1
+            if self._records_since_sweep >= 1000:
+                self._records_since_sweep = 0
+                oldest = self._oldest_bucket_id()
+                idle = [pid for pid, spend in self._patients.items() if spend.expire(oldest) == 0.0]
+                for pid in idle:
+                    del self._patients[pid]
+
+    def get_patient_spend(self, patient_id: str) -> float:
+        """
+        Get a patient's spend within the current window.
+
+        Args:
+            patient_id: UUID of the patient
+
+        Returns:
+            Spend in USD
+        """
+        with self._lock:
+            patient = self._patients.get(patient_id)
+            return patient.expire(self._oldest_bucket_id()) if patient else 0.0
+
+    def get_stats(self) -> dict[str, any]:
+        """
+        Get budget statistics.
+
+        Returns:
+            Dictionary with statistics
+        """
+        with self._lock:
+            return {
+                "window_seconds": self.window_seconds,
+                "patient_budget_usd": self.patient_budget_usd,
+                "global_budget_usd": self.global_budget_usd,
+                "global_spend_usd": round(self._global.expire(self._oldest_bucket_id()), 6),
+                "tracked_patients": len(self._patients),
+                "decisions": dict(self._decisions),
+            }
+
+    def _bucket_id(self) -> int:
+        return int(time.monotonic() // self._bucket_seconds)
+
+    def _oldest_bucket_id(self) -> int:
+        return self._bucket_id() - _BUCKETS_PER_WINDOW + 1
@@ -6,9 +6,17 @@ from app.schemas.chat_schemas import (
     RetrievalResult,
     LLMResponse,
 )
+from app.core.logging_config import logger
+from app.services.budget_service import BudgetService, compute_cost
+from app.services.chunk_compression_service import ChunkCompressionService
 from app.services.config_service import ConfigService
+from app.services.document_type_service import DocumentTypeService
 from app.services.memory_service import MemoryService
+from app.services.prefetch_service import PrefetchService
+from app.services.token_estimator import TokenEstimator
+import threading
 import time
+from typing import Iterator, Optional
 from prompts import SYSTEM_PROMPT
 
 
@@ -19,14 +27,137 @@ class ChatService:
         config_service: ConfigService,
         llm_service,
         memory_service: MemoryService,
+        prefetch_service: Optional[PrefetchService] = None,
+        document_type_service: Optional[DocumentTypeService] = None,
+        chunk_compression_service: Optional[ChunkCompressionService] = None,
+        budget_service: Optional[BudgetService] = None,
+        token_estimator: Optional[TokenEstimator] = None,
     ) -> None:
         self.bedrock_agent_runtime = bedrock_agent_runtime
         self.config_service = config_service
         self.llm_service = llm_service
         self.memory_service = memory_service
+        self.prefetch_service = prefetch_service or PrefetchService(enabled=False)
+        self.document_type_service = document_type_service or DocumentTypeService()
+        self.chunk_compression_service = chunk_compression_service or ChunkCompressionService()
+        self.budget_service = budget_service or BudgetService()
+        self.token_estimator = token_estimator or TokenEstimator()
+
+    def start_session(self, patient_id: str, prefetch: bool = True) -> bool:
+        """Mark a patient opening a chat session and, unless told not to, warm the retrieval cache."""
+        return self.prefetch_service.start_session(
+            patient_id, self._fetch_candidates, prefetch
+        )
 
     def fetch_chunks(self, request: ChatRequest) -> RetrievalResponse:
-        retrieval_results = self._retrieve_only(request)
+        start = time.perf_counter()
+        inferred_type = None
+        if not request.document_type and settings.DOCUMENT_TYPE_NARROWING_ENABLED:
+            inferred_type = self.document_type_service.infer(request.query)
+
+        candidates = self.prefetch_service.take(
+            request.patient_id, request.document_type or inferred_type
+        )
+        chunks = self._rerank_candidates(request, candidates) if candidates else None
+        warm = chunks is not None
+        if not warm:
+            if inferred_type:
+                chunks = self._fetch_narrowed(request, inferred_type)
+            else:
+                chunks = self._fetch_from_kb(request)
+                self.document_type_service.record_retrieval(
+                    "explicit" if request.document_type else "broad",
+                    time.perf_counter() - start,
+                )
+        self.prefetch_service.record_kb_turn(
+            request.patient_id, time.perf_counter() - start, warm
+        )
+        return chunks
+
+    def _fetch_narrowed(self, request: ChatRequest, document_type: str) -> RetrievalResponse:
+        """Retrieve with an inferred document_type filter, falling back to the broad filter on low recall."""
+        start = time.perf_counter()
+        narrowed = self._fetch_from_kb(request.model_copy(update={"document_type": document_type}))
+        if len(narrowed.results) >= settings.MIN_NARROWED_RESULTS:
+            self.document_type_service.record_retrieval("narrowed", time.perf_counter() - start)
+            return narrowed
+
+        logger.info(
+            "↩️ Narrowed retrieval returned {chunk_count} chunks for document_type "
+            "'{document_type}' | Falling back to broad filter",
+            chunk_count=len(narrowed.results),
+            document_type=document_type,
+        )
+        broad = self._fetch_from_kb(request)
+        self.document_type_service.record_retrieval("fallback", time.perf_counter() - start)
+        return broad
+
+    def _fetch_candidates(self, request: ChatRequest) -> RetrievalResponse:
+        """Retrieve a topic's candidate pool without reranking, for the prefetch cache."""
+        return self._fetch_from_kb(request, rerank=False)
+
+    def _rerank_candidates(
+        self, request: ChatRequest, candidates: RetrievalResponse
+    ) -> Optional[RetrievalResponse]:
+        """
+        Rerank a prefetched candidate pool against the user's actual question.
+
+        Args:
+            request: The chat request being answered
+            candidates: Chunks prefetched with a generic topic query
+
+        Returns:
+            The top reranked chunks, or None if the pool is empty, reranking failed, or
+            the pool has too few chunks relevant enough to answer the question
+        """
+        if not candidates.results:
+            return None
+        try:
+            response = self.bedrock_agent_runtime.rerank(
+                queries=[{"type": "TEXT", "textQuery": {"text": request.query}}],
+                sources=[
+                    {
+                        "type": "INLINE",
+                        "inlineDocumentSource": {
+                            "type": "TEXT",
+                            "textDocument": {"text": result.content},
+                        },
+                    }
+                    for result in candidates.results
+                ],
+                rerankingConfiguration=self.config_service.get_rerank_config(
+                    len(candidates.results)
+                ),
+            )
+        except Exception as e:
+            logger.error(
+                "❌ Rerank of prefetched chunks failed: {error} | Falling back to retrieval",
+                error=str(e),
+            )
+            return None
+
+        reranked = [
+            candidates.results[ranked["index"]].model_copy(
+                update={"score": ranked.get("relevanceScore", 0.0)}
+            )
+            for ranked in response.get("results", [])
+        ]
+        top_score = max((result.score for result in reranked), default=0.0)
+        # The pool was retrieved for a generic topic query; reranking can reorder it but
+        # not add what it is missing, so a weak pool means the question needs its own retrieval
+        if len(reranked) < settings.MIN_NARROWED_RESULTS or top_score < settings.PREFETCH_MIN_RELEVANCE:
+            self.prefetch_service.record_rejected()
+            logger.info(
+                "↩️ Prefetched pool too weak for the question | Chunks: {chunk_count} | "
+                "Top relevance: {top_score:.2f} | Falling back to retrieval",
+                chunk_count=len(reranked),
+                top_score=top_score,
+            )
+            return None
+        return RetrievalResponse(results=reranked)
+
+    def _fetch_from_kb(self, request: ChatRequest, rerank: bool = True) -> RetrievalResponse:
+        retrieval_results = self._retrieve_only(request, rerank)
         formatted_results = []
         for result in retrieval_results:
             content_text = result.get("content", {}).get("text", "")
@@ -37,9 +168,9 @@ class ChatService:
             )
         return RetrievalResponse(results=formatted_results)
 
-    def _retrieve_only(self, request: ChatRequest):
+    def _retrieve_only(self, request: ChatRequest, rerank: bool = True):
         vector_search_config = self.config_service.get_vector_search_config(
-            request.patient_id, request.document_type
+            request.patient_id, request.document_type, rerank
         )
         response = self.bedrock_agent_runtime.retrieve(
             knowledgeBaseId=settings.KNOWLEDGE_BASE_ID,
@@ -49,6 +180,109 @@ class ChatService:
         return response.get("retrievalResults", [])
 
     def generate_response(self, USER_QUESTION: str, patient_id: str, request: ChatRequest):
+        # 1-3. Load history, classify intent and build the user turn prompt
+        conversation_history, user_turn_prompt, kb_required = self._prepare_turn(
+            USER_QUESTION, patient_id, request
+        )
+
+        # 4. Check the cost budget before spending any tokens
+        plan = self._plan_generation(patient_id, conversation_history, user_turn_prompt)
+        if plan is None:
+            return ChatResponse(complete_response=[self._budget_exceeded_response(kb_required)])
+        conversation_history, model_id, max_tokens, estimated_input = plan
+
+        # 5. Call Claude
+        start_claude = time.perf_counter()
+        claude_raw, input_tokens, output_tokens = self.llm_service.infer_claude(
+            system_prompt=SYSTEM_PROMPT,
+            user_prompt=user_turn_prompt,
+            conversation_history=conversation_history,
+            model_id=model_id,
+            max_tokens=max_tokens,
+        )
+        end_claude = time.perf_counter()
+
+        claude_obj = self._build_llm_response(
+            claude_raw, end_claude - start_claude, input_tokens, output_tokens, kb_required, model_id
+        )
+        self._record_usage(patient_id, claude_obj.total_cost, estimated_input, input_tokens)
+
+        # 6. Store exchange in memory AFTER the response
+        self.memory_service.add_message(patient_id, "user", USER_QUESTION)
+        self.memory_service.add_message(patient_id, "assistant", claude_raw)
+
+        return ChatResponse(complete_response=[claude_obj])
+
+    def stream_response(
+        self,
+        USER_QUESTION: str,
+        patient_id: str,
+        request: ChatRequest,
+        cancel_event: threading.Event,
+    ) -> Iterator[dict]:
+        """
+        Streaming variant of generate_response used by the WebSocket channel.
+
+        Yields {"type": "token", "content": ...} events while Claude generates and a
+        final {"type": "done", "response": LLMResponse} event. If cancel_event is set
+        before the answer completes, a {"type": "cancelled"} event is yielded instead
+        and the partial exchange is NOT stored in memory.
+        """
+        conversation_history, user_turn_prompt, kb_required = self._prepare_turn(
+            USER_QUESTION, patient_id, request
+        )
+
+        # The user may have already sent a newer message while we were classifying/retrieving
+        if cancel_event.is_set():
+            yield {"type": "cancelled"}
+            return
+
+        plan = self._plan_generation(patient_id, conversation_history, user_turn_prompt)
+        if plan is None:
+            yield {"type": "done", "response": self._budget_exceeded_response(kb_required)}
+            return
+        conversation_history, model_id, max_tokens, estimated_input = plan
+
+        start_claude = time.perf_counter()
+        parts: list[str] = []
+        input_tokens, output_tokens = 0, 0
+        for kind, value in self.llm_service.stream_claude(
+            system_prompt=SYSTEM_PROMPT,
+            user_prompt=user_turn_prompt,
+            conversation_history=conversation_history,
+            cancel_event=cancel_event,
+            model_id=model_id,
+            max_tokens=max_tokens,
+        ):
+            if kind == "text":
+                parts.append(value)
+                yield {"type": "token", "content": value}
+            elif kind == "usage":
+                input_tokens, output_tokens = value
+        end_claude = time.perf_counter()
+
+        if cancel_event.is_set():
+            # Bedrock still bills the aborted generation; usage is not reported, so estimate it
+            partial_output = self.token_estimator.count("".join(parts))
+            self.budget_service.record(
+                patient_id, compute_cost(model_id, estimated_input, partial_output)
+            )
+            yield {"type": "cancelled"}
+            return
+
+        claude_raw = "".join(parts)
+        claude_obj = self._build_llm_response(
+            claude_raw, end_claude - start_claude, input_tokens, output_tokens, kb_required, model_id
+        )
+        self._record_usage(patient_id, claude_obj.total_cost, estimated_input, input_tokens)
+
+        self.memory_service.add_message(patient_id, "user", USER_QUESTION)
+        self.memory_service.add_message(patient_id, "assistant", claude_raw)
+
+        yield {"type": "done", "response": claude_obj}
+
+    def _prepare_turn(self, USER_QUESTION: str, patient_id: str, request: ChatRequest):
+        """Returns (conversation_history, user_turn_prompt, kb_required) for a chat turn."""
         # 1. Get conversation history BEFORE adding the current message
         conversation_history = self.memory_service.get_conversation_history(patient_id)
         history_str = self.memory_service.get_formatted_history(patient_id)
@@ -56,10 +290,19 @@ class ChatService:
         # 2. Classify intent
         kb_required = self.llm_service.classify_intent(USER_QUESTION, history_str)
 
+        # Every new session is tracked for first-KB-turn latency, but only a non-KB
+        # opener (e.g. a greeting) leaves time to warm the retrieval cache
+        if not conversation_history:
+            self.start_session(patient_id, prefetch=not kb_required)
+
         # 3. Build user turn prompt
         if kb_required:
-            chunks = self.fetch_chunks(request)
-            context_data = "\n".join([f"- {c.content}" for c in chunks.results])
+            chunks = self.fetch_chunks(request).results
+            if settings.CHUNK_COMPRESSION_ENABLED:
+                chunks = self.chunk_compression_service.compress(
+                    chunks, [msg["content"] for msg in conversation_history]
+                )
+            context_data = "\n".join([f"- {c.content}" for c in chunks])
             user_turn_prompt = (
                 f"NEWLY RETRIEVED MEDICAL RECORDS:\n{context_data}\n\n"
                 f"USER QUESTION: {USER_QUESTION}"
@@ -69,33 +312,87 @@ class ChatService:
             # conversation history in the multi-turn message thread.
             user_turn_prompt = f"USER QUESTION: {USER_QUESTION}"
 
-        # 4. Call Claude
-        PRICE_INPUT_PER_M = 3.00
-        PRICE_OUTPUT_PER_M = 15.00
+        return conversation_history, user_turn_prompt, kb_required
 
-        start_claude = time.perf_counter()
-        claude_raw, input_tokens, output_tokens = self.llm_service.infer_claude(
-            system_prompt=SYSTEM_PROMPT,
-            user_prompt=user_turn_prompt,
-            conversation_history=conversation_history,
+    def _plan_generation(
+        self, patient_id: str, conversation_history: list[dict[str, str]], user_turn_prompt: str
+    ):
+        """
+        Estimate the call's cost and apply the patient/global budgets.
+
+        Returns:
+            (conversation_history, model_id, max_tokens, estimated_input_tokens) to call Claude
+            with, possibly degraded, or None if the budget does not allow the call
+        """
+        model_id = self.llm_service.model_id
+        max_tokens = settings.MAX_OUTPUT_TOKENS
+        estimated_input = self.token_estimator.estimate_input(
+            SYSTEM_PROMPT, user_turn_prompt, conversation_history
+        )
+
+        # Degraded call: shorter output, optional cheaper model, only the latest exchanges
+        keep = settings.DEGRADED_HISTORY_MESSAGES - settings.DEGRADED_HISTORY_MESSAGES % 2
+        degraded_history = conversation_history[-keep:] if keep > 0 else []
+        degraded_model = settings.FALLBACK_MODEL_ID or model_id
+        degraded_max_tokens = min(settings.DEGRADED_MAX_TOKENS, max_tokens)
+        degraded_input = self.token_estimator.estimate_input(
+            SYSTEM_PROMPT, user_turn_prompt, degraded_history
         )
-        end_claude = time.perf_counter()
 
-        total_cost = (input_tokens / 1_000_000) * PRICE_INPUT_PER_M + \
-                     (output_tokens / 1_000_000) * PRICE_OUTPUT_PER_M
+        decision = self.budget_service.plan(
+            patient_id,
+            full_cost=compute_cost(model_id, estimated_input, max_tokens),
+            degraded_cost=compute_cost(degraded_model, degraded_input, degraded_max_tokens),
+        )
+        if decision == BudgetService.REJECT:
+            logger.warning("💸 Budget exhausted | Patient: {patient_id}", patient_id=patient_id)
+            return None
+        if decision == BudgetService.DEGRADE:
+            logger.info(
+                "💸 Budget nearly exhausted, degrading call | Patient: {patient_id} | Model: {model_id}",
+                patient_id=patient_id,
+                model_id=degraded_model,
+            )
+            return degraded_history, degraded_model, degraded_max_tokens, degraded_input
+        return conversation_history, model_id, max_tokens, estimated_input
+
+    def _record_usage(
+        self, patient_id: str, total_cost: float, estimated_input: int, input_tokens: int
+    ) -> None:
+        self.budget_service.record(patient_id, total_cost)
+        self.token_estimator.calibrate(estimated_input, input_tokens)
 
-        claude_obj = LLMResponse(
-            model_name="Claude-3.5-Sonnet",
+    def _budget_exceeded_response(self, kb_required: bool) -> LLMResponse:
+        return LLMResponse(
+            model_name="Rebecca (Budget Limit)",
+            response=(
+                "I'm sorry, but you've reached the usage limit for now. "
+                "Please try again a little later — your conversation history will still be here."
+            ),
+            latency=0.0,
+            input_tokens=0,
+            output_tokens=0,
+            total_cost=0.0,
+            kb_fetched=kb_required,
+        )
+
+    def _build_llm_response(
+        self,
+        claude_raw: str,
+        latency: float,
+        input_tokens: int,
+        output_tokens: int,
+        kb_required: bool,
+        model_id: str,
+    ) -> LLMResponse:
+        total_cost = compute_cost(model_id, input_tokens, output_tokens)
+
+        return LLMResponse(
+            model_name="Claude-3.5-Sonnet" if model_id == settings.MODEL_ID else model_id,
             response=claude_raw,
-            latency=end_claude - start_claude,
+            latency=latency,
             input_tokens=input_tokens,
             output_tokens=output_tokens,
             total_cost=total_cost,
             kb_fetched=kb_required,
         )
-
-        # 5. Store exchange in memory AFTER the response
-        self.memory_service.add_message(patient_id, "user", USER_QUESTION)
-        self.memory_service.add_message(patient_id, "assistant", claude_raw)
-
-        return ChatResponse(complete_response=[claude_obj])
\ No newline at end of file
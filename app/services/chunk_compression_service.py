@@ -0,0 +1,147 @@
+import re
+import threading
+
+from app.schemas.chat_schemas import RetrievalResult
+
+_WHITESPACE = re.compile(r"[ \t]+")
+_WORD = re.compile(r"\w+")
+# Lines that carry no clinical information wherever they appear. Only exact banner
+# forms match: "Confidential: HIV-1 antibody reactive" is a finding, not a banner.
+_BOILERPLATE_LINE = re.compile(
+    r"^(page \d+( of \d+)?"
+    r"|(strictly )?(private and )?confidential( document| information| patient information)?"
+    r"|printed on:? [\d/.:\- ]+(am|pm)?"
+    r"|[-=_*#.\s]+)$",
+    re.IGNORECASE,
+)
+# A first/last line repeated in at least this many chunks is treated as a page header/footer
+_MIN_HEADER_REPEATS = 3
+_SHINGLE_SIZE = 5
+
+
+class ChunkCompressionService:
+    """
+    Post-retrieval cleanup of chunks before they are sent to Claude.
+
+    Strips boilerplate and headers repeated across chunks, drops chunks that are
+    near-duplicates of a higher-ranked chunk, and drops chunks whose text is
+    already in the patient's recent conversation. Kept chunks retain their score
+    and uri, and the reranker's order is preserved.
+    """
+
+    def __init__(self, duplicate_threshold: float = 0.8):
+        """
+        Initialize the chunk compression service.
+
+        Args:
+            duplicate_threshold: Fraction of a chunk's word 5-grams that must already be
+                covered (by kept chunks or recent context) for it to be dropped
+        """
+        self.duplicate_threshold = duplicate_threshold
+        self._lock = threading.Lock()
+        self._stats = {"chunks_in": 0, "chunks_out": 0, "chars_in": 0, "chars_out": 0}
+
+    def compress(
+        self, results: list[RetrievalResult], recent_context: list[str] | None = None
+    ) -> list[RetrievalResult]:
+        """
+        Remove boilerplate and redundant chunks.
+
+        Args:
+            results: Retrieved chunks in reranked order
+            recent_context: Message texts already present in the conversation thread
+
+        Returns:
+            The chunks worth sending, in the same order
+        """
+        context_shingles: set[int] = set()
+        for text in recent_context or []:
+            context_shingles |= self._shingles(text)
+
+        chunk_lines = [self._clean_lines(result.content) for result in results]
+        headers = self._repeated_headers(chunk_lines)
+
+        seen_headers: set[str] = set()
+        covered: set[int] = set()
+        kept: list[RetrievalResult] = []
+        for result, lines in zip(results, chunk_lines):
+            content = self._strip_headers(lines, headers, seen_headers)
+            if not content:
+                continue
+
+            shingles = self._shingles(content)
+            if self._containment(shingles, covered) >= self.duplicate_threshold:
+                continue
+            if self._containment(shingles, context_shingles) >= self.duplicate_threshold:
+                continue
+
+            covered |= shingles
+            kept.append(result.model_copy(update={"content": content}))
+
+        with self._lock:
+            self._stats["chunks_in"] += len(results)
+            self._stats["chunks_out"] += len(kept)
+            self._stats["chars_in"] += sum(len(r.content) for r in results)
+            self._stats["chars_out"] += sum(len(r.content) for r in kept)
+        return kept
+
+    def get_stats(self) -> dict[str, any]:
+        """
+        Get cumulative compression statistics.
+
+        Returns:
+            Dictionary with statistics
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats["char_reduction"] = (
+            round(1 - stats["chars_out"] / stats["chars_in"], 4) if stats["chars_in"] else None
+        )
+        return stats
+
+    @staticmethod
+    def _clean_lines(content: str) -> list[str]:
+        """Normalize whitespace and drop boilerplate lines."""
+        lines = []
+        for raw_line in content.splitlines():
+            line = _WHITESPACE.sub(" ", raw_line).strip()
+            if line and not _BOILERPLATE_LINE.match(line):
+                lines.append(line)
+        return lines
+
+    @staticmethod
+    def _repeated_headers(chunk_lines: list[list[str]]) -> set[str]:
+        """First/last lines shared by several chunks, e.g. a page header with the patient's name."""
+        counts: dict[str, int] = {}
+        for lines in chunk_lines:
+            for edge in {lines[0], lines[-1]} if lines else ():
+                counts[edge] = counts.get(edge, 0) + 1
+        return {line for line, count in counts.items() if count >= _MIN_HEADER_REPEATS}
+
+    @staticmethod
+    def _strip_headers(lines: list[str], headers: set[str], seen_headers: set[str]) -> str:
+        """Keep the first occurrence of each repeated header and drop it from later chunks."""
+        kept = []
+        for i, line in enumerate(lines):
+            if (i == 0 or i == len(lines) - 1) and line in headers:
+                if line in seen_headers:
+                    continue
+                seen_headers.add(line)
+            kept.append(line)
+        return "\n".join(kept)
+
+    @staticmethod
+    def _shingles(text: str) -> set[int]:
+        words = _WORD.findall(text.lower())
+        if len(words) < _SHINGLE_SIZE:
+            return {hash(tuple(words))} if words else set()
+        return {
+            hash(tuple(words[i:i + _SHINGLE_SIZE]))
+            for i in range(len(words) - _SHINGLE_SIZE + 1)
+        }
+
+    @staticmethod
+    def _containment(shingles: set[int], covered: set[int]) -> float:
+        if not shingles or not covered:
+            return 0.0
+        return len(shingles & covered) / len(shingles)
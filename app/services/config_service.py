@@ -29,21 +29,38 @@ class ConfigService:
         return {"equals": {"key": "patient_id", "value": patient_id}}
 
     def get_vector_search_config(
-        self, patient_id: str, document_type: Optional[str] = None
+        self, patient_id: str, document_type: Optional[str] = None, rerank: bool = True
     ):
         """
         Returns the vectorSearchConfiguration for the retrieve API.
+        Without rerank, all NUMBER_OF_CHUNKS_TO_FETCH candidates are returned.
         """
         filter_config = self._get_filters(patient_id, document_type)
 
-        return {
+        config = {
             "numberOfResults": settings.NUMBER_OF_CHUNKS_TO_FETCH,
             "filter": filter_config,
-            "rerankingConfiguration": {
+        }
+        if rerank:
+            config["rerankingConfiguration"] = {
                 "type": "BEDROCK_RERANKING_MODEL",
                 "bedrockRerankingConfiguration": {
                     "modelConfiguration": {"modelArn": settings.RERANK_MODEL_ARN},
                     "numberOfRerankedResults": settings.NUMBER_OF_RESULTS_AFTER_RERANKING,
                 },
+            }
+        return config
+
+    def get_rerank_config(self, number_of_sources: int):
+        """
+        Returns the rerankingConfiguration for the standalone rerank API.
+        """
+        return {
+            "type": "BEDROCK_RERANKING_MODEL",
+            "bedrockRerankingConfiguration": {
+                "modelConfiguration": {"modelArn": settings.RERANK_MODEL_ARN},
+                "numberOfResults": min(
+                    settings.NUMBER_OF_RESULTS_AFTER_RERANKING, number_of_sources
+                ),
             },
         }
@@ -0,0 +1,119 @@
+import re
+import threading
+from collections import deque
+from typing import Optional
+
+# Keyword model mapping the built-in document types to query terms.
+# A term matches any query word starting with it (so "prescri" covers "prescribed").
+# The types are used as KB `document_type` metadata values unless DOCUMENT_TYPE_LABELS
+# maps them to the labels the KB actually uses.
+DOCUMENT_TYPE_KEYWORDS: dict[str, tuple[str, ...]] = {
+    "lab_report": (
+        "lab", "test", "result", "blood", "cholesterol", "glucose", "a1c", "hba1c",
+        "panel", "hemoglobin", "platelet", "creatinine", "urine",
+    ),
+    "prescription": (
+        "medication", "medicine", "drug", "dose", "dosage", "prescri", "pill",
+        "tablet", "refill", "mg",
+    ),
+    "visit_note": ("visit", "appointment", "checkup", "check-up", "consultation", "follow-up"),
+    "discharge_summary": ("discharge", "admitted", "admission", "hospitali", "hospital stay"),
+    "imaging_report": (
+        "x-ray", "xray", "mri", "ct", "ultrasound", "scan", "imaging", "radiolog", "mammogra",
+    ),
+}
+
+_WORD_PATTERN = re.compile(r"[a-z0-9][a-z0-9\-]*")
+
+
+class DocumentTypeService:
+    """
+    Infers the document type a question is about so retrieval can be narrowed.
+
+    Also keeps counters on how often narrowing was applied, how often it fell back
+    to the broad patient filter, and the retrieval latency of each path.
+    """
+
+    def __init__(self, min_hits: int = 1, labels: Optional[dict[str, str]] = None):
+        """
+        Initialize the document type service.
+
+        Args:
+            min_hits: Minimum keyword hits for the best type to be considered confident
+            labels: Built-in document type -> KB `document_type` metadata value
+        """
+        self.min_hits = min_hits
+        self.labels = labels or {}
+        self._lock = threading.Lock()
+        self._counts = {"broad": 0, "explicit": 0, "narrowed": 0, "fallback": 0}
+        self._latencies: dict[str, deque] = {
+            path: deque(maxlen=1000) for path in self._counts
+        }
+
+    def infer(self, query: str) -> Optional[str]:
+        """
+        Infer the document type of a query.
+
+        Args:
+            query: The user's question
+
+        Returns:
+            The KB document_type label if exactly one type scores best with enough hits, else None
+        """
+        query_lower = query.lower()
+        words = _WORD_PATTERN.findall(query_lower)
+
+        scores = []
+        for document_type, keywords in DOCUMENT_TYPE_KEYWORDS.items():
+            hits = 0
+            for keyword in keywords:
+                if " " in keyword:
+                    hits += keyword in query_lower
+                else:
+                    hits += any(word.startswith(keyword) for word in words)
+            if hits:
+                scores.append((hits, document_type))
+
+        if not scores:
+            return None
+        scores.sort(reverse=True)
+        best_hits, best_type = scores[0]
+        # Ambiguous questions (e.g. labs *and* medications) keep the broad filter
+        if best_hits < self.min_hits or (len(scores) > 1 and scores[1][0] == best_hits):
+            return None
+        return self.labels.get(best_type, best_type)
+
+    def record_retrieval(self, path: str, latency: float) -> None:
+        """
+        Record one knowledge base retrieval.
+
+        Args:
+            path: "broad", "explicit" (document_type sent by the client), "narrowed"
+                or "fallback" (narrowed with low recall, then broad)
+            latency: Seconds spent on retrieval, including any fallback call
+        """
+        with self._lock:
+            self._counts[path] += 1
+            self._latencies[path].append(latency)
+
+    def get_stats(self) -> dict[str, any]:
+        """
+        Get statistics about document type narrowing.
+
+        Returns:
+            Dictionary with statistics
+        """
+        with self._lock:
+            total = sum(self._counts.values())
+            return {
+                "total_retrievals": total,
+                "narrowing_rate": round((self._counts["narrowed"] + self._counts["fallback"]) / total, 4) if total else None,
+                "paths": {
+                    path: {
+                        "count": count,
+                        "avg_latency_ms": round(sum(self._latencies[path]) / len(self._latencies[path]) * 1000, 2)
+                        if self._latencies[path] else None,
+                    }
+                    for path, count in self._counts.items()
+                },
+            }
@@ -1,17 +1,26 @@
 import json
-from groq import Groq
+import threading
 from app.core.config import settings
-from app.core.logging_config import logger
-from typing import List, Dict
+from app.core.logging_config import logger, redact, should_log
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from prompts.classifier_prompt import CLASSIFIER_PROMPT
 
 
 class LLMService:
-    def __init__(self, bedrock_runtime):
+    def __init__(self, bedrock_runtime, groq_client=None):
         self.region = settings.AWS_DEFAULT_REGION
         self.model_id = settings.MODEL_ID
         self.bedrock_runtime = bedrock_runtime
-        self.groq_client = Groq(api_key=settings.GROQ_API_KEY)
+        self._groq_client = groq_client
+
+    @property
+    def groq_client(self):
+        # groq is only imported when a classification actually needs it
+        if self._groq_client is None:
+            from groq import Groq
+
+            self._groq_client = Groq(api_key=settings.GROQ_API_KEY)
+        return self._groq_client
 
     def classify_intent(self, query: str, history_str: str) -> bool:
         """
@@ -52,20 +61,29 @@ class LLMService:
             kb_required = result.get("kb_required", True)
             reasoning = result.get("reasoning", "No reasoning provided")
             
-            # Log the classification decision with reasoning
-            logger.info(
-                f"🔍 Query Classification | "
-                f"Query: '{query[:100]}{'...' if len(query) > 100 else ''}' | "
-                f"KB Required: {kb_required} | "
-                f"Reasoning: {reasoning}"
-            )
+            # Log the classification decision with reasoning (sampled, high volume)
+            if should_log("INFO"):
+                logger.info(
+                    "🔍 Query Classification | Query: '{query}' | "
+                    "KB Required: {kb_required} | Reasoning: {reasoning}",
+                    query=redact(query),
+                    kb_required=kb_required,
+                    reasoning=redact(reasoning),
+                )
             
             return kb_required
         except Exception as e:
-            logger.error(f"❌ Classification error: {e} | Defaulting to KB fetch")
+            logger.error("❌ Classification error: {error} | Defaulting to KB fetch", error=str(e))
             return True
 
-    def infer_claude(self, system_prompt: str, user_prompt: str, conversation_history: List[Dict[str, str]] = None):
+    def infer_claude(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        conversation_history: List[Dict[str, str]] = None,
+        model_id: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+    ):
         """
         Invoke Claude using the proper system and messages structure.
         
@@ -73,12 +91,93 @@ class LLMService:
             system_prompt: The system instructions (Rebecca's personality and rules)
             user_prompt: The current user prompt with context
             conversation_history: List of previous messages [{"role": "user/assistant", "content": "..."}]
+            model_id: Bedrock model to use instead of the configured MODEL_ID
+            max_tokens: Maximum number of output tokens instead of the configured MAX_OUTPUT_TOKENS
             
         Returns:
             Tuple of (response_text, input_tokens, output_tokens)
         """
-        messages = []
+        messages = self._build_messages(user_prompt, conversation_history)
+
+        # 3. Use the dedicated 'system' parameter in Bedrock
+        response = self.bedrock_runtime.converse(
+            modelId=model_id or self.model_id,
+            system=[{"text": system_prompt}],  # Correct way to pass system instructions
+            messages=messages,
+            inferenceConfig={
+                "maxTokens": max_tokens or settings.MAX_OUTPUT_TOKENS,
+                "temperature": 0.2,
+            },
+        )
         
+        usage = response.get("usage", {})
+        return (
+            response["output"]["message"]["content"][0]["text"],
+            usage.get("inputTokens", 0),
+            usage.get("outputTokens", 0),
+        )
+
+    def stream_claude(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        conversation_history: List[Dict[str, str]] = None,
+        cancel_event: Optional[threading.Event] = None,
+        model_id: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+    ) -> Iterator[Tuple[str, Any]]:
+        """
+        Stream Claude's answer token by token using the Bedrock ConverseStream API.
+
+        Args:
+            system_prompt: The system instructions (Rebecca's personality and rules)
+            user_prompt: The current user prompt with context
+            conversation_history: List of previous messages [{"role": "user/assistant", "content": "..."}]
+            cancel_event: When set, the Bedrock stream is closed so no further tokens are generated
+            model_id: Bedrock model to use instead of the configured MODEL_ID
+            max_tokens: Maximum number of output tokens instead of the configured MAX_OUTPUT_TOKENS
+
+        Yields:
+            ("text", str) for every text delta and a final ("usage", (input_tokens, output_tokens))
+        """
+        messages = self._build_messages(user_prompt, conversation_history)
+
+        response = self.bedrock_runtime.converse_stream(
+            modelId=model_id or self.model_id,
+            system=[{"text": system_prompt}],
+            messages=messages,
+            inferenceConfig={
+                "maxTokens": max_tokens or settings.MAX_OUTPUT_TOKENS,
+                "temperature": 0.2,
+            },
+        )
+
+        stream = response["stream"]
+        input_tokens, output_tokens = 0, 0
+        try:
+            for event in stream:
+                if cancel_event is not None and cancel_event.is_set():
+                    # Closing the underlying HTTP stream aborts generation on Bedrock's side
+                    logger.info("⏹️ Claude stream cancelled by client")
+                    return
+                if "contentBlockDelta" in event:
+                    text = event["contentBlockDelta"].get("delta", {}).get("text")
+                    if text:
+                        yield "text", text
+                elif "metadata" in event:
+                    usage = event["metadata"].get("usage", {})
+                    input_tokens = usage.get("inputTokens", 0)
+                    output_tokens = usage.get("outputTokens", 0)
+        finally:
+            stream.close()
+
+        yield "usage", (input_tokens, output_tokens)
+
+    @staticmethod
+    def _build_messages(user_prompt: str, conversation_history: List[Dict[str, str]] = None):
+        """Build the Bedrock Converse message thread from history and the current prompt."""
+        messages = []
+
         # 1. Add conversation history (this is your memory)
         if conversation_history:
             for msg in conversation_history:
@@ -86,27 +185,13 @@ class LLMService:
                     "role": msg["role"],
                     "content": [{"text": msg["content"]}]
                 })
-        
+
         # 2. Add current user prompt
         messages.append({
             "role": "user",
             "content": [{"text": user_prompt}]
         })
-        
-        # 3. Use the dedicated 'system' parameter in Bedrock
-        response = self.bedrock_runtime.converse(
-            modelId=self.model_id,
-            system=[{"text": system_prompt}],  # Correct way to pass system instructions
-            messages=messages,
-            inferenceConfig={"maxTokens": 1024, "temperature": 0.2},
-        )
-        
-        usage = response.get("usage", {})
-        return (
-            response["output"]["message"]["content"][0]["text"],
-            usage.get("inputTokens", 0),
-            usage.get("outputTokens", 0),
-        )
+        return messages
 
     # Comment out the entire MedGemma logic below
     """
@@ -0,0 +1,329 @@
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+from app.core.logging_config import logger
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Journal records are compact JSON arrays, one per line:
+#   ["a", patient_id, role, content]   add a message
+#   ["c", patient_id]                  clear one patient's history
+#   ["x"]                              clear all histories
+#   ["g", generation]                  header written after each snapshot
+# The snapshot stores the generation of the journal that continues it, so a journal
+# left behind by a crash mid-compaction (older generation) is not replayed twice.
+_ADD, _CLEAR, _CLEAR_ALL, _GENERATION = "a", "c", "x", "g"
+_STOP = object()
+# Wait before retrying a failed compaction, so a full disk is not re-read every batch
+_COMPACTION_RETRY_SECONDS = 60.0
+# Upper bound on worker-<n> slots, i.e. on worker processes sharing one journal directory
+_MAX_WORKER_SLOTS = 64
+
+
+def _private_opener(path, flags: int) -> int:
+    """open() opener for files holding patient conversations: owner read/write only."""
+    fd = os.open(path, flags, 0o600)
+    if hasattr(os, "fchmod"):
+        # Also tightens files created before permissions were enforced
+        os.fchmod(fd, 0o600)
+    return fd
+
+
+class MemoryJournal:
+    """
+    Append-only, write-behind persistence for MemoryService.
+
+    Callers only enqueue records; a background thread writes them in batches and
+    periodically folds the journal into a snapshot so restores stay fast. Each
+    worker process locks its own worker-<n> slot under the journal directory, so
+    several workers (uvicorn --workers N) can share one MEMORY_JOURNAL_DIR. Like
+    the in-memory history, a slot's contents belong to whichever worker claims it.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        flush_interval: float = 0.5,
+        batch_size: int = 1000,
+        snapshot_every: int = 200_000,
+    ):
+        """
+        Initialize the journal.
+
+        Args:
+            directory: Directory holding one worker-<n> slot per worker process
+            flush_interval: Maximum seconds a record waits in the queue before being written
+            batch_size: Maximum number of records written per batch
+            snapshot_every: Number of journal records after which a new snapshot is written
+        """
+        self.base_directory = Path(directory)
+        # Journal and snapshot hold patient questions and answers in plaintext
+        self.base_directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+        # Set by lock() to the claimed worker slot
+        self.directory = None
+        self.journal_path = None
+        self.snapshot_path = None
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.snapshot_every = snapshot_every
+
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="memory-journal", daemon=True)
+        self._records_since_snapshot = 0
+        self._max_messages = None
+        self._generation = 0
+        self._journal_stale = False
+        self._file = None
+        self._lock_file = None
+        # Set once a snapshot has advanced the generation but the new journal is not open yet
+        self._needs_new_journal = False
+        self._next_compaction_at = 0.0
+
+    def append_message(self, patient_id: str, role: str, content: str) -> None:
+        self._queue.put((_ADD, patient_id, role, content))
+
+    def append_clear(self, patient_id: str) -> None:
+        self._queue.put((_CLEAR, patient_id))
+
+    def append_clear_all(self) -> None:
+        self._queue.put((_CLEAR_ALL,))
+
+    def lock(self) -> None:
+        """
+        Claim and lock the first free worker-<n> slot under the journal directory.
+
+        Called before anything is read, so a process never sees another process's files.
+
+        Raises:
+            RuntimeError: If every slot is locked by another process
+        """
+        if self.directory is not None:
+            return
+        if fcntl is None:
+            logger.warning("⚠️ File locking unavailable | Memory journal supports a single worker only")
+            self._use_slot(self.base_directory / "worker-0")
+            return
+
+        for slot in range(_MAX_WORKER_SLOTS):
+            directory = self.base_directory / f"worker-{slot}"
+            directory.mkdir(mode=0o700, exist_ok=True)
+            lock_file = open(directory / "journal.lock", "a", opener=_private_opener)
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                continue
+            self._lock_file = lock_file
+            self._use_slot(directory)
+            logger.info("💾 Memory journal slot claimed | Slot: {slot}", slot=directory.name)
+            return
+        raise RuntimeError(
+            f"All {_MAX_WORKER_SLOTS} memory journal slots in {self.base_directory} "
+            "are locked by other processes"
+        )
+
+    def _use_slot(self, directory: Path) -> None:
+        self.directory = directory
+        self.journal_path = directory / "journal.jsonl"
+        self.snapshot_path = directory / "snapshot.json"
+
+    def restore(self, max_messages: int) -> dict[str, deque]:
+        """
+        Lock a worker slot and rebuild conversation histories from its snapshot and journal.
+
+        Args:
+            max_messages: Per-patient message limit, applied while replaying
+
+        Returns:
+            Dictionary of patient_id to deque of messages
+        """
+        self.lock()
+        start = time.perf_counter()
+        self._max_messages = max_messages
+        conversations, replayed = self._load(max_messages)
+        self._records_since_snapshot = replayed
+        logger.info(
+            "💾 Memory restored | Patients: {patients} | "
+            "Journal records replayed: {replayed} | Took: {seconds:.2f}s",
+            patients=len(conversations),
+            replayed=replayed,
+            seconds=time.perf_counter() - start,
+        )
+        return conversations
+
+    def _load(self, max_messages: int) -> tuple[dict[str, deque], int]:
+        conversations: dict[str, deque] = {}
+        generation = 0
+
+        if self.snapshot_path.exists():
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+            generation = snapshot["generation"]
+            for patient_id, messages in snapshot["conversations"].items():
+                conversations[patient_id] = deque(messages, maxlen=max_messages)
+
+        self._generation = generation
+        self._journal_stale = False
+        replayed = 0
+        if self.journal_path.exists():
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                header = f.readline()
+                journal_generation = 0
+                if header.startswith(f'["{_GENERATION}"'):
+                    journal_generation = json.loads(header)[1]
+                else:
+                    f.seek(0)
+                if journal_generation < generation:
+                    # Already folded into the snapshot before a crash; start it over
+                    self._journal_stale = True
+                    return conversations, 0
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A crash can leave a partially written last line
+                        logger.warning("⚠️ Skipping corrupt memory journal record")
+                        continue
+                    self._apply(conversations, record, max_messages)
+                    replayed += 1
+        return conversations, replayed
+
+    def start(self) -> None:
+        """Open the journal for appending and start the background writer."""
+        self.lock()
+        self._needs_new_journal = self._journal_stale or not self.journal_path.exists()
+        self._ensure_open()
+        self._thread.start()
+
+    def close(self) -> None:
+        """Flush every pending record, stop the background writer and release the lock."""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    @staticmethod
+    def _apply(conversations: dict[str, deque], record, max_messages: int) -> None:
+        op = record[0]
+        if op == _ADD:
+            messages = conversations.get(record[1])
+            if messages is None:
+                messages = conversations[record[1]] = deque(maxlen=max_messages)
+            messages.append({"role": record[2], "content": record[3]})
+        elif op == _CLEAR:
+            conversations.pop(record[1], None)
+        elif op == _CLEAR_ALL:
+            conversations.clear()
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch = []
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+                while True:
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        break
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                pass
+
+            if batch:
+                try:
+                    self._write(batch)
+                except Exception as e:
+                    logger.error(
+                        "❌ Memory journal write failed: {error} | {lost} records lost",
+                        error=str(e),
+                        lost=len(batch),
+                    )
+                    continue
+
+            if (
+                self._records_since_snapshot >= self.snapshot_every
+                and time.monotonic() >= self._next_compaction_at
+            ):
+                try:
+                    self._compact()
+                except Exception as e:
+                    # Every record is already fsynced to the journal; only the snapshot is missing
+                    self._next_compaction_at = time.monotonic() + _COMPACTION_RETRY_SECONDS
+                    logger.error(
+                        "❌ Memory snapshot failed: {error} | Journal kept, retrying in {retry:.0f}s",
+                        error=str(e),
+                        retry=_COMPACTION_RETRY_SECONDS,
+                    )
+
+        if self._file is not None:
+            self._file.close()
+
+    def _write(self, batch: list) -> None:
+        self._ensure_open()
+        self._file.write(
+            "".join(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n" for record in batch)
+        )
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._records_since_snapshot += len(batch)
+
+    def _compact(self) -> None:
+        """Fold snapshot + journal into a new snapshot and truncate the journal."""
+        # Only this thread writes the files, so replaying them gives a consistent view
+        # without touching MemoryService state used by request threads. The journal
+        # stays open until the new snapshot is in place, so a failure here loses nothing.
+        conversations, _ = self._load(self._max_messages)
+        snapshot = {
+            "generation": self._generation + 1,
+            "conversations": {
+                patient_id: list(messages) for patient_id, messages in conversations.items()
+            },
+        }
+
+        tmp_path = self.snapshot_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8", opener=_private_opener) as f:
+            json.dump(snapshot, f, ensure_ascii=False, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+        # The snapshot now holds every journaled record; the next batch starts a new journal
+        self._generation += 1
+        self._records_since_snapshot = 0
+        self._needs_new_journal = True
+        self._file.close()
+        self._file = None
+        logger.info("💾 Memory snapshot written | Patients: {patients}", patients=len(conversations))
+
+    def _ensure_open(self) -> None:
+        """Open the journal if it is closed, starting a new one after a snapshot."""
+        if self._file is not None:
+            return
+        if self._needs_new_journal:
+            self._open_new_journal()
+            self._needs_new_journal = False
+        else:
+            self._file = open(self.journal_path, "a", encoding="utf-8", opener=_private_opener)
+
+    def _open_new_journal(self) -> None:
+        f = open(self.journal_path, "w", encoding="utf-8", opener=_private_opener)
+        try:
+            f.write(json.dumps([_GENERATION, self._generation]) + "\n")
+            f.flush()
+        except Exception:
+            f.close()
+            raise
+        self._file = f
@@ -1,18 +1,23 @@
 from collections import deque
+from typing import Optional
+
+from app.services.memory_journal import MemoryJournal
 
 
 class MemoryService:
     """
     Manages conversation history in memory.
     Each patient has their own conversation history (max 6 exchanges = 12 messages).
+    If a journal is given, history is persisted write-behind and restored on startup.
     """
 
-    def __init__(self, max_exchanges: int = 6):
+    def __init__(self, max_exchanges: int = 6, journal: Optional[MemoryJournal] = None):
         """
         Initialize the memory service.
         
         Args:
             max_exchanges: Maximum number of exchanges (user + assistant pairs) to keep
+            journal: Optional write-behind journal used to survive restarts
         """
         # Dictionary to store chat history per patient
         # Key: patient_id, Value: deque of messages
@@ -20,6 +25,13 @@ class MemoryService:
         self.max_exchanges = max_exchanges
         self.max_messages = max_exchanges * 2  # Each exchange = user + assistant message
 
+        self._journal = journal
+        if journal is not None:
+            # Claim a worker slot first, so nothing another worker is writing gets read
+            journal.lock()
+            self._conversations = journal.restore(self.max_messages)
+            journal.start()
+
     def add_message(self, patient_id: str, role: str, content: str) -> None:
         """
         Add a message to the patient's conversation history.
@@ -38,6 +50,8 @@ class MemoryService:
         }
         
         self._conversations[patient_id].append(message)
+        if self._journal is not None:
+            self._journal.append_message(patient_id, role, content)
 
     def get_conversation_history(self, patient_id: str) -> list[dict[str, str]]:
         """
@@ -90,6 +104,8 @@ class MemoryService:
         try:
             if patient_id in self._conversations:
                 del self._conversations[patient_id]
+                if self._journal is not None:
+                    self._journal.append_clear(patient_id)
             return True
         except Exception as e:
             print(f"Error clearing conversation history: {e}")
@@ -152,11 +168,20 @@ class MemoryService:
         """
         try:
             self._conversations.clear()
+            if self._journal is not None:
+                self._journal.append_clear_all()
             return True
         except Exception as e:
             print(f"Error clearing all histories: {e}")
             return False
 
+    def close(self) -> None:
+        """
+        Flush pending journal writes. Call on application shutdown.
+        """
+        if self._journal is not None:
+            self._journal.close()
+
     def get_stats(self) -> dict[str, any]:
         """
         Get statistics about stored conversations.
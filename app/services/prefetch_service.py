@@ -0,0 +1,204 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+
+from app.core.logging_config import logger
+from app.schemas.chat_schemas import ChatRequest, RetrievalResponse
+
+# Topics most sessions open with, keyed by the built-in document types.
+# Each topic's candidate pool is retrieved with a generic query when a session starts.
+PREFETCH_TOPICS: dict[str, str] = {
+    "lab_report": "latest lab test results",
+    "prescription": "current medications and dosages",
+    "visit_note": "most recent doctor visit notes",
+}
+# Expired entries are swept at most this often, so the sweep stays off most requests
+_PURGE_INTERVAL_SECONDS = 1.0
+
+
+class PrefetchService:
+    """
+    Warms a per-patient retrieval cache when a chat session starts.
+
+    Retrievals run on a small thread pool and are stored as futures, so a question
+    that arrives while its topic is still being fetched waits for the in-flight
+    call instead of starting a new one. Cached entries are unreranked candidate
+    pools that the caller reranks against the actual question, and are served once.
+    Expired entries are purged as calls come in, so unclaimed results do not linger.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        ttl_seconds: int = 300,
+        max_workers: int = 4,
+        labels: Optional[dict[str, str]] = None,
+    ):
+        """
+        Initialize the prefetch service.
+
+        Args:
+            enabled: Whether sessions trigger background retrieval at all
+            ttl_seconds: How long a prefetched result may be served after it was scheduled
+            max_workers: Size of the background retrieval thread pool
+            labels: Built-in document type -> KB `document_type` metadata value
+        """
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        labels = labels or {}
+        # Key: KB document_type label, Value: generic topic query
+        self._topics = {labels.get(dtype, dtype): query for dtype, query in PREFETCH_TOPICS.items()}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._lock = threading.Lock()
+        # Key: (patient_id, document_type), Value: (expires_at, future)
+        self._entries: dict[tuple[str, str], tuple[float, Future]] = {}
+        # Patients whose session started but who have not asked a KB question yet,
+        # with the time until which their first KB turn is still tracked
+        self._awaiting_first_kb: dict[str, float] = {}
+        self._next_purge_at = 0.0
+        self._hits = 0
+        self._misses = 0
+        self._rejected = 0
+        self._first_kb_latencies: dict[str, deque] = {
+            "warm": deque(maxlen=1000),
+            "cold": deque(maxlen=1000),
+        }
+
+    def start_session(
+        self,
+        patient_id: str,
+        fetch: Callable[[ChatRequest], RetrievalResponse],
+        prefetch: bool = True,
+    ) -> bool:
+        """
+        Mark the start of a patient session and, if enabled, prefetch common topics.
+
+        Args:
+            patient_id: UUID of the patient
+            fetch: Callable performing the actual knowledge base retrieval
+            prefetch: Whether to schedule background retrieval or only track the first KB turn
+
+        Returns:
+            True if background retrieval was scheduled
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._purge_expired(now)
+            self._awaiting_first_kb[patient_id] = now + self.ttl_seconds
+            if not self.enabled or not prefetch:
+                return False
+
+            scheduled = False
+            for document_type, query in self._topics.items():
+                key = (patient_id, document_type)
+                if key in self._entries:
+                    continue
+                request = ChatRequest(
+                    query=query, patient_id=patient_id, document_type=document_type
+                )
+                future = self._executor.submit(fetch, request)
+                self._entries[key] = (now + self.ttl_seconds, future)
+                scheduled = True
+
+        if scheduled:
+            logger.info("🔥 Prefetch scheduled | Patient: {patient_id}", patient_id=patient_id)
+        return scheduled
+
+    def take(
+        self, patient_id: str, document_type: Optional[str]
+    ) -> Optional[RetrievalResponse]:
+        """
+        Pop the warm candidate pool for a document type, waiting for it if still in flight.
+
+        Args:
+            patient_id: UUID of the patient
+            document_type: Document type sent by the client or inferred from the question
+
+        Returns:
+            The prefetched, unreranked RetrievalResponse, or None on a cache miss
+        """
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            now = time.monotonic()
+            self._purge_expired(now)
+            entry = self._entries.pop((patient_id, document_type), None) if document_type else None
+            if entry is None or entry[0] < now:
+                self._misses += 1
+                return None
+
+        try:
+            result = entry[1].result()
+        except Exception as e:
+            logger.error(
+                "❌ Prefetch failed | Patient: {patient_id} | Error: {error}",
+                patient_id=patient_id,
+                error=str(e),
+            )
+            with self._lock:
+                self._misses += 1
+            return None
+
+        with self._lock:
+            self._hits += 1
+        return result
+
+    def record_rejected(self) -> None:
+        """Count a prefetched pool that was taken but too weak for the question to be served."""
+        with self._lock:
+            self._rejected += 1
+
+    def record_kb_turn(self, patient_id: str, latency: float, warm: bool) -> None:
+        """
+        Record retrieval latency if this is the first KB turn of the patient's session.
+
+        Args:
+            patient_id: UUID of the patient
+            latency: Seconds spent obtaining the chunks
+            warm: Whether the chunks were served from the prefetch cache
+        """
+        with self._lock:
+            self._purge_expired(time.monotonic())
+            if self._awaiting_first_kb.pop(patient_id, None) is None:
+                return
+            self._first_kb_latencies["warm" if warm else "cold"].append(latency)
+
+    def get_stats(self) -> dict[str, any]:
+        """
+        Get prefetch cache statistics and first-KB-turn latency with and without a warm cache.
+
+        Returns:
+            Dictionary with statistics
+        """
+        with self._lock:
+            first_kb_turn = {
+                source: {
+                    "count": len(samples),
+                    "avg_latency_ms": round(sum(samples) / len(samples) * 1000, 2) if samples else None,
+                }
+                for source, samples in self._first_kb_latencies.items()
+            }
+            return {
+                "enabled": self.enabled,
+                "cached_entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                # Hits whose reranked pool did not answer the question and fell back to retrieval
+                "rejected": self._rejected,
+                "first_kb_turn": first_kb_turn,
+            }
+
+    def _purge_expired(self, now: float) -> None:
+        if now < self._next_purge_at:
+            return
+        self._next_purge_at = now + _PURGE_INTERVAL_SECONDS
+        expired = [key for key, (expires_at, _) in self._entries.items() if expires_at < now]
+        for key in expired:
+            # Drop the reference to the unclaimed records; a queued fetch is skipped entirely
+            self._entries.pop(key)[1].cancel()
+        stale = [pid for pid, until in self._awaiting_first_kb.items() if until < now]
+        for pid in stale:
+            del self._awaiting_first_kb[pid]
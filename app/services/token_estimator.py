@@ -0,0 +1,89 @@
+import re
+import threading
+
+from prompts import SYSTEM_PROMPT
+
+# Word pieces of up to 4 characters plus single punctuation marks approximate
+# Claude's BPE tokens for English text (~3.5-4 characters per token). The regex
+# does all the work in C, so counting a full prompt takes microseconds.
+_TOKEN_PIECE = re.compile(r"\w{1,4}|[^\w\s]")
+
+# Role markers and message framing added by the Converse API per message
+_MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def _count_tokens(text: str) -> int:
+    return len(_TOKEN_PIECE.findall(text))
+
+
+# The system prompt is identical on every call, so it is counted once. User prompts and
+# history hold patient data and rarely repeat, so they are counted fresh and never cached.
+_SYSTEM_PROMPT_TOKENS = _count_tokens(SYSTEM_PROMPT)
+
+
+class TokenEstimator:
+    """
+    Predicts Claude input tokens locally before a request is sent.
+
+    The raw count is scaled by a correction ratio learned from the token usage
+    Bedrock reports after each call.
+    """
+
+    def __init__(self, learning_rate: float = 0.1):
+        """
+        Initialize the token estimator.
+
+        Args:
+            learning_rate: Weight of each observed actual/estimated ratio in the correction
+        """
+        self.learning_rate = learning_rate
+        self._ratio = 1.0
+        self._lock = threading.Lock()
+
+    def count(self, text: str) -> int:
+        """Estimated token count of a piece of text."""
+        return round(_count_tokens(text) * self._ratio)
+
+    def estimate_input(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        conversation_history: list[dict[str, str]] | None = None,
+    ) -> int:
+        """
+        Estimate the input tokens of a Converse call.
+
+        Args:
+            system_prompt: The system instructions
+            user_prompt: The current user prompt with context
+            conversation_history: Previous messages sent along with the prompt
+
+        Returns:
+            Estimated number of input tokens
+        """
+        system_tokens = (
+            _SYSTEM_PROMPT_TOKENS if system_prompt == SYSTEM_PROMPT else _count_tokens(system_prompt)
+        )
+        raw = system_tokens + _count_tokens(user_prompt) + _MESSAGE_OVERHEAD_TOKENS
+        for msg in conversation_history or []:
+            raw += _count_tokens(msg["content"]) + _MESSAGE_OVERHEAD_TOKENS
+        return round(raw * self._ratio)
+
+    def calibrate(self, estimated: int, actual: int) -> None:
+        """
+        Adjust the correction ratio from a call's reported input tokens.
+
+        Args:
+            estimated: The value returned by estimate_input for the call
+            actual: inputTokens reported by Bedrock
+        """
+        if estimated <= 0 or actual <= 0:
+            return
+        with self._lock:
+            observed = actual / estimated
+            self._ratio *= 1 + self.learning_rate * (observed - 1)
+            self._ratio = min(max(self._ratio, 0.5), 2.0)
+
+    @property
+    def ratio(self) -> float:
+        return self._ratio
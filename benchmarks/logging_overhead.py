@@ -0,0 +1,97 @@
+"""
+Benchmark of per-request logging cost on the caller thread.
+
+Replays the classifier and error log calls of a chat request from several
+threads at once: first with the previous setup (synchronous default sink,
+eagerly built f-strings), then with configure_logging() and no sampling, so
+the background sink's own cost is visible, and finally with INFO sampled at 10%.
+
+Each run reports the time seen by the request threads and the total including
+draining the writer thread, which competes with them for the GIL.
+
+Run from the repository root:
+    python -m benchmarks.logging_overhead [--threads 8] [--requests 20000]
+"""
+
+import argparse
+import tempfile
+import threading
+import time
+
+from app.core.logging_config import configure_logging, logger, redact, should_log, shutdown_logging
+
+QUERY = "Can you tell me what my last blood panel said about my LDL cholesterol and whether I should worry? " * 2
+REASONING = "The user asks about specific lab results from their own records, so KB access is required. " * 3
+
+
+def request_before(i: int) -> None:
+    logger.info(
+        f"🔍 Query Classification | "
+        f"Query: '{QUERY[:100]}{'...' if len(QUERY) > 100 else ''}' | "
+        f"KB Required: {True} | "
+        f"Reasoning: {REASONING}"
+    )
+    if i % 50 == 0:
+        logger.error(f"Chat endpoint error | Patient: patient-{i} | Query: '{QUERY[:100]}' | Error: timeout")
+
+
+def request_after(i: int) -> None:
+    if should_log("INFO"):
+        logger.info(
+            "🔍 Query Classification | Query: '{query}' | "
+            "KB Required: {kb_required} | Reasoning: {reasoning}",
+            query=redact(QUERY),
+            kb_required=True,
+            reasoning=redact(REASONING),
+        )
+    if i % 50 == 0:
+        logger.error(
+            "Chat endpoint error | Patient: {patient_id} | Query: '{query}' | Error: {error}",
+            patient_id=f"patient-{i}",
+            query=redact(QUERY),
+            error="timeout",
+        )
+
+
+def run(label: str, request, threads: int, requests: int, drain) -> None:
+    def worker(offset: int) -> None:
+        for i in range(offset, offset + requests):
+            request(i)
+
+    workers = [threading.Thread(target=worker, args=(n * requests,)) for n in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    caller = time.perf_counter() - start
+    drain()
+    total = time.perf_counter() - start
+
+    per_request = 1e6 / (threads * requests)
+    print(
+        f"{label:<16} {caller * per_request:8.2f} µs per request on the caller thread, "
+        f"{total * per_request:8.2f} µs including the writer drain"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=20_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryFile("w") as sink:
+        logger.remove()
+        logger.add(sink)
+        run("before", request_before, args.threads, args.requests, logger.remove)
+
+        configure_logging(sink=sink, sample_rates={})
+        run("after, unsampled", request_after, args.threads, args.requests, shutdown_logging)
+
+        configure_logging(sink=sink, sample_rates={"INFO": 0.1})
+        run("after, INFO 10%", request_after, args.threads, args.requests, shutdown_logging)
+
+
+if __name__ == "__main__":
+    main()
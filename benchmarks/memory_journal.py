@@ -0,0 +1,84 @@
+"""
+Benchmarks for the MemoryService write-behind journal.
+
+Measures the request-path cost of add_message with and without a journal, and
+how long a restart takes to restore one million messages from the journal
+alone and from a compacted snapshot.
+
+Run from the repository root:
+    python -m benchmarks.memory_journal [--turns 200000] [--messages 1000000]
+"""
+
+import argparse
+import tempfile
+import time
+
+from app.services.memory_journal import MemoryJournal
+from app.services.memory_service import MemoryService
+
+CONTENT = "What did my last blood test say about my cholesterol levels? " * 4
+
+
+def bench_write_overhead(turns: int, directory: str) -> None:
+    for label, journal in (
+        ("in-memory only", None),
+        ("write-behind journal", MemoryJournal(directory)),
+    ):
+        memory = MemoryService(max_exchanges=6, journal=journal)
+        start = time.perf_counter()
+        for i in range(turns):
+            patient_id = f"patient-{i % 10_000}"
+            memory.add_message(patient_id, "user", CONTENT)
+            memory.add_message(patient_id, "assistant", CONTENT)
+        elapsed = time.perf_counter() - start
+        memory.close()
+        print(f"{label:<22} {elapsed / turns * 1e6:8.2f} µs per turn ({turns} turns)")
+
+
+def bench_restore(messages: int, patients: int, directory: str) -> None:
+    journal = MemoryJournal(directory, snapshot_every=messages * 2)
+    journal.restore(max_messages=12)
+    journal.start()
+    for i in range(messages):
+        journal.append_message(f"patient-{i % patients}", "user" if i % 2 == 0 else "assistant", CONTENT)
+    journal.close()
+
+    reader = MemoryJournal(directory)
+    start = time.perf_counter()
+    reader.restore(max_messages=12)
+    replay = time.perf_counter() - start
+    reader.close()
+
+    # One more record with a threshold of 1 makes the writer fold everything into a snapshot
+    compactor = MemoryJournal(directory, snapshot_every=1)
+    compactor.restore(max_messages=12)
+    compactor.start()
+    compactor.append_clear("no-such-patient")
+    compactor.close()
+
+    reader = MemoryJournal(directory)
+    start = time.perf_counter()
+    reader.restore(max_messages=12)
+    snapshot = time.perf_counter() - start
+    reader.close()
+
+    scale = 1_000_000 / messages
+    print(f"restore from journal   {replay * scale:8.2f} s per million messages")
+    print(f"restore from snapshot  {snapshot * scale:8.2f} s per million messages ({patients} patients)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=200_000)
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--patients", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        bench_write_overhead(args.turns, directory)
+    with tempfile.TemporaryDirectory() as directory:
+        bench_restore(args.messages, args.patients, directory)
+
+
+if __name__ == "__main__":
+    main()
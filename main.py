@@ -1,12 +1,53 @@
-from fastapi import FastAPI
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 # import logfire
+from app.core.config import get_settings
+from app.core.dependencies import get_memory_service, warm_up
+from app.core.logging_config import configure_logging, logger, shutdown_logging
 from app.routes import api_router
 
+
+def _warm_up(app: FastAPI):
+    start = time.perf_counter()
+    try:
+        warm_up()
+    except Exception as e:
+        logger.error("❌ Warm-up failed: {error} | Serving with cold clients", error=str(e))
+    app.state.ready = True
+    logger.info("✅ Warm-up finished in {seconds:.2f}s", seconds=time.perf_counter() - start)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.ready = False
+    # Fail fast on missing configuration
+    settings = get_settings()
+    configure_logging(
+        level=settings.LOG_LEVEL,
+        json_logs=settings.LOG_JSON,
+        sample_rates=settings.LOG_SAMPLE_RATES,
+        field_max_chars=settings.LOG_FIELD_MAX_CHARS,
+    )
+    # Restore conversation memory before serving so the first request doesn't pay for it
+    memory_service = get_memory_service()
+    # Network warm-up runs on a daemon thread; /ready reports when it is done, and
+    # shutdown never waits for a warm-up call stuck on SDK timeouts and retries
+    threading.Thread(target=_warm_up, args=(app,), name="warm-up", daemon=True).start()
+    yield
+    memory_service.close()
+    # Drain the background log queue before exit
+    shutdown_logging()
+
+
 app = FastAPI(
     title="Rebecca API",
     description="API for Rebecca which lets patients and providers chat with medical records",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Configure CORS
@@ -35,3 +76,12 @@ async def root():
 @app.get("/health")
 async def health():
     return {"message": "Healthy...."}
+
+
+@app.get("/ready")
+async def ready(response: Response):
+    """Readiness probe: 503 until SDK clients are resolved and connections are warm."""
+    if not getattr(app.state, "ready", False):
+        response.status_code = 503
+        return {"message": "Warming up...."}
+    return {"message": "Ready...."}